@@ -0,0 +1,53 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled hot loops for DrainParser.
+
+Build in place with:
+
+    cythonize -3 --inplace preprocessing/_drain_fast.pyx
+
+drain_parser.py falls back to its pure-Python loops when this extension
+isn't built.
+"""
+
+from cpython cimport array
+
+def record_templates(list templates, list log_lines, dict id_of, array.array counts,
+                     list examples, Py_ssize_t max_examples):
+    """
+    Record template occurrences into DrainParser's bookkeeping arrays.
+
+    Args:
+        templates: Extracted template per log line
+        log_lines: Raw log lines the templates came from
+        id_of: Template to template ID mapping, updated in place
+        counts: array('q') of counts indexed by template ID, updated in place
+        examples: Example lines indexed by template ID, updated in place
+        max_examples: Maximum number of example lines kept per template
+
+    Returns:
+        Templates seen for the first time, in order of first appearance
+    """
+    cdef list new_templates = []
+    cdef list template_examples
+    cdef Py_ssize_t i, template_id
+    cdef str template
+
+    for i in range(len(templates)):
+        template = templates[i]
+        value = id_of.get(template)
+        if value is None:
+            template_id = len(counts)
+            id_of[template] = template_id
+            array.resize_smart(counts, template_id + 1)
+            counts.data.as_longlongs[template_id] = 1
+            examples.append([log_lines[i]])
+            new_templates.append(template)
+        else:
+            template_id = value
+            counts.data.as_longlongs[template_id] += 1
+            template_examples = examples[template_id]
+            if len(template_examples) < max_examples:
+                template_examples.append(log_lines[i])
+
+    return new_templates
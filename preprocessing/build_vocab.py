@@ -5,9 +5,11 @@ This module builds vocabulary from parsed log templates in data/parsed/
 and creates a mapping from template text to token IDs.
 """
 
-import json
+import sys
 from pathlib import Path
 from collections import Counter
+from utils.json_io import dumps
+from utils.template_io import find_template_files, iter_template_file
 
 class VocabularyBuilder:
     """
@@ -17,9 +19,8 @@ class VocabularyBuilder:
     def __init__(self, min_freq: int = 2, max_vocab_size: int = 50000):
         self.min_freq = min_freq
         self.max_vocab_size = max_vocab_size
-        self.vocab = {}
         self.token_to_id = {}
-        self.id_to_token = {}
+        self.id_to_token = []
         
     def build_vocab(self, templates: dict) -> dict:
         """Build vocabulary from log templates."""
@@ -34,29 +35,26 @@ class VocabularyBuilder:
         
         # Add special tokens
         special_tokens = {'<PAD>': 0, '<UNK>': 1, '<MASK>': 2, '<CLS>': 3, '<SEP>': 4}
-        self.vocab = special_tokens.copy()
         self.token_to_id = special_tokens.copy()
         
-        # Add templates to vocabulary
-        for i, (template, count) in enumerate(sorted_templates[:self.max_vocab_size - len(special_tokens)]):
-            token_id = len(self.vocab)
-            self.vocab[template] = token_id
-            self.token_to_id[template] = token_id
-            self.id_to_token[token_id] = template
+        # Add templates to vocabulary, interned so later stages share the strings
+        for template, count in sorted_templates[:self.max_vocab_size - len(special_tokens)]:
+            self.token_to_id[sys.intern(template)] = len(self.token_to_id)
+        
+        # IDs are assigned in insertion order, so the keys are already indexed by ID
+        self.id_to_token = list(self.token_to_id)
             
         return template_counts
     
     def save_vocab(self, filepath: str):
         """Save vocabulary to JSON file."""
         vocab_data = {
-            'vocab': self.vocab,
             'token_to_id': self.token_to_id,
-            'id_to_token': self.id_to_token,
             'min_freq': self.min_freq,
             'max_vocab_size': self.max_vocab_size
         }
-        with open(filepath, 'w') as f:
-            json.dump(vocab_data, f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(dumps(vocab_data))
 
 def load_all_templates():
     """Load all template files from data/parsed/ directory."""
@@ -67,14 +65,12 @@ def load_all_templates():
         print("Error: data/parsed/ directory not found!")
         return all_templates
     
-    # Load all template JSON files
-    for template_file in parsed_dir.glob("*_templates.json"):
+    # Load all template files
+    for template_file in find_template_files(parsed_dir):
         print(f"Loading templates from {template_file}...")
-        with open(template_file, 'r') as f:
-            templates = json.load(f)
-            
-        # Merge templates (handle duplicates by summing counts)
-        for template_text, template_data in templates.items():
+        # Stream templates and merge them as they are read, so a large file
+        # is never held as a separate dict (handle duplicates by summing counts)
+        for template_text, template_data in iter_template_file(str(template_file)):
             if template_text in all_templates:
                 all_templates[template_text]['count'] += template_data['count']
                 all_templates[template_text]['examples'].extend(template_data['examples'])
@@ -105,7 +101,7 @@ def main():
     Path("data").mkdir(exist_ok=True)
     builder.save_vocab(vocab_file)
     
-    print(f"Vocabulary built with {len(builder.vocab)} tokens")
+    print(f"Vocabulary built with {len(builder.token_to_id)} tokens")
     print(f"Saved vocabulary to {vocab_file}")
 
 if __name__ == "__main__":
@@ -6,29 +6,278 @@ log templates from raw log files in data/raw/ and saving them to data/parsed/.
 """
 
 import re
-import json
 import os
-from typing import List, Dict, Tuple
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from functools import lru_cache
+from itertools import islice
+from typing import List, Dict, Tuple, Optional, Iterator
 import logging
 from pathlib import Path
+from utils.template_io import save_template_table, iter_template_file
+
+try:
+    import hyperscan
+    HAVE_HYPERSCAN = True
+except ImportError:
+    HAVE_HYPERSCAN = False
+
+try:
+    from preprocessing import _drain_fast
+    HAVE_DRAIN_FAST = True
+except ImportError:
+    HAVE_DRAIN_FAST = False
+
+try:
+    from preprocessing import _strip
+    HAVE_STRIP = True
+except ImportError:
+    HAVE_STRIP = False
+
+# Variable parts of a log line as (placeholder, pattern) pairs, in priority
+# order. They are combined into one alternation so a line is scanned once; at
+# the same start position earlier alternatives win, so timestamps are tried
+# before IPs and UUIDs before plain numbers.
+_VARIABLE_PATTERNS = [
+    ('timestamp', r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}'  # 2024-01-01 10:00:00
+                  r'|\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}'  # 01/01/2024 10:00:00
+                  r'|\d{10,}'),                            # Unix timestamp
+    ('ip', r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b'),
+    ('uuid', r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'),
+    ('path', r'/[^\s]+'),
+    ('number', r'\b\d{5,}\b'),  # keep small numbers that might be important
+]
+
+_VARIABLE_PATTERN = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in _VARIABLE_PATTERNS))
+
+# Hyperscan reports every end offset of a match, so a long path would fire
+# once per character. Anchoring the path on the whitespace that ends it
+# reports it once; the trailing whitespace is trimmed in the match handler.
+_HYPERSCAN_OVERRIDES = {'path': r'/[^\s]+(?:\s|$)'}
+
+# Lines containing these can't go through Hyperscan: Python's str \s also
+# matches the ASCII separators \x1c-\x1f, Hyperscan's does not
+_HYPERSCAN_UNSAFE_CHARS = re.compile(r'[\x1c-\x1f]')
+
+_hyperscan_db = None
+
+def _replace_variable(match: re.Match) -> str:
+    """Return the placeholder for a matched variable part."""
+    return f'<{match.lastgroup}>'
+
+@lru_cache(maxsize=65536)
+def _extract_template_cached(log_line: str) -> str:
+    """Strip variable parts from a log line, memoized on the raw line."""
+    return _VARIABLE_PATTERN.sub(_replace_variable, log_line).strip()
+
+def _get_hyperscan_db():
+    """Compile the variable patterns into a Hyperscan database on first use."""
+    global _hyperscan_db
+    if _hyperscan_db is None:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[_HYPERSCAN_OVERRIDES.get(name, pattern).encode('ascii')
+                         for name, pattern in _VARIABLE_PATTERNS],
+            ids=list(range(len(_VARIABLE_PATTERNS))),
+            elements=len(_VARIABLE_PATTERNS),
+            flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(_VARIABLE_PATTERNS)
+        )
+        _hyperscan_db = db
+    return _hyperscan_db
+
+class _TrieNode:
+    """Node of a TemplateTrie."""
+    __slots__ = ('children', 'pattern_children', 'wildcard_child', 'is_wildcard', 'end')
+    
+    def __init__(self, is_wildcard: bool = False):
+        self.children = {}
+        # Token -> (compiled pattern, max line tokens it spans, exact, child)
+        self.pattern_children = {}
+        self.wildcard_child = None
+        self.is_wildcard = is_wildcard
+        self.end = None
+
+# Placeholders as they appear inside template tokens
+_PLACEHOLDER_PATTERN = re.compile(r'<(\*|' + '|'.join(name for name, _ in _VARIABLE_PATTERNS) + r')>')
+_PLACEHOLDER_REGEX = dict(_VARIABLE_PATTERNS, **{'*': r'\S+'})
+
+class TemplateTrie:
+    """
+    Prefix tree over tokenized templates for matching log lines.
+    
+    A "<*>" token is a wildcard absorbing one or more tokens of the log
+    line. Tokens holding a named placeholder, bare like "<number>" or
+    embedded like "user=<number>", match only line tokens that extraction
+    turns into that same token. A line is matched in a single walk shared by all
+    templates instead of being compared against each template in turn.
+    """
+    WILDCARD = '<*>'
+    
+    def __init__(self):
+        self.root = _TrieNode()
+    
+    def insert(self, template: str):
+        """
+        Add a template to the trie.
+        
+        Args:
+            template: Template with placeholder tokens
+        """
+        node = self.root
+        for token in template.split():
+            if token == self.WILDCARD:
+                if node.wildcard_child is None:
+                    node.wildcard_child = _TrieNode(is_wildcard=True)
+                node = node.wildcard_child
+            elif _PLACEHOLDER_PATTERN.search(token):
+                entry = node.pattern_children.get(token)
+                if entry is None:
+                    entry = node.pattern_children[token] = self._compile_token(token) + (_TrieNode(),)
+                node = entry[3]
+            else:
+                child = node.children.get(token)
+                if child is None:
+                    child = node.children[token] = _TrieNode()
+                node = child
+        node.end = template
+    
+    @staticmethod
+    def _compile_token(token: str) -> Tuple[re.Pattern, int, bool]:
+        """
+        Build the pattern for a template token containing placeholders.
+        
+        Args:
+            token: Template token such as "<ip>" or "user=<number>"
+            
+        Returns:
+            Tuple of (compiled pattern, number of line tokens it can span,
+            exact). Timestamps contain a space, so each one can add a line
+            token. Tokens without "<*>" are exact: a pattern match is only a
+            prefilter, since the placeholder patterns overlap (a 10 digit run
+            fits <number> but is extracted as <timestamp>), and the line text
+            must also extract to the token itself.
+        """
+        parts = []
+        span = 1
+        pos = 0
+        for placeholder in _PLACEHOLDER_PATTERN.finditer(token):
+            parts.append(re.escape(token[pos:placeholder.start()]))
+            parts.append(f'(?:{_PLACEHOLDER_REGEX[placeholder.group(1)]})')
+            if placeholder.group(1) == 'timestamp':
+                span += 1
+            pos = placeholder.end()
+        parts.append(re.escape(token[pos:]))
+        return re.compile(''.join(parts)), span, '<*>' not in token
+    
+    def match(self, log_line: str) -> Optional[str]:
+        """
+        Find the template matching a raw log line.
+        
+        Walks (node, token index) states depth first with an explicit stack.
+        Literal tokens are tried first and a wildcard absorbs as few tokens
+        as possible. States that failed are never tried again, so the walk
+        is linear in the line length.
+        
+        Args:
+            log_line: Raw log line
+            
+        Returns:
+            Matching template, or None if no template matches
+        """
+        tokens = log_line.split()
+        n = len(tokens)
+        stack = [(self.root, 0)]
+        seen = set()
+        
+        while stack:
+            state = stack.pop()
+            if state in seen:
+                continue
+            seen.add(state)
+            node, i = state
+            
+            if i == n:
+                if node.end is not None:
+                    return node.end
+                continue
+            
+            # Pushed in reverse order of preference
+            if node.is_wildcard:
+                stack.append((node, i + 1))
+            if node.wildcard_child is not None:
+                stack.append((node.wildcard_child, i + 1))
+            for token, (pattern, span, exact, child) in node.pattern_children.items():
+                for k in range(min(span, n - i), 0, -1):
+                    text = ' '.join(tokens[i:i + k])
+                    if pattern.fullmatch(text) and (
+                            not exact or _VARIABLE_PATTERN.sub(_replace_variable, text) == token):
+                        stack.append((child, i + k))
+            child = node.children.get(tokens[i])
+            if child is not None:
+                stack.append((child, i + 1))
+        
+        return None
 
 class DrainParser:
     """
     Drain log parser implementation for template extraction.
     """
-    def __init__(self, depth: int = 4, sim_threshold: float = 0.4):
+    def __init__(self, depth: int = 4, sim_threshold: float = 0.4, max_examples: int = 8):
         """
         Initialize Drain parser.
         
         Args:
             depth: Depth of the parse tree
             sim_threshold: Similarity threshold for template matching
+            max_examples: Maximum number of example lines kept per template
         """
         self.depth = depth
         self.sim_threshold = sim_threshold
+        self.max_examples = max_examples
         self.parse_tree = {}
-        self.templates = {}
-        self.template_id = 0
+        
+        # Template bookkeeping as parallel arrays indexed by template ID
+        self._id_of = {}
+        self._count = array('q')
+        self._examples = []
+        self._trie = TemplateTrie()
+    
+    @property
+    def templates(self) -> Dict[str, dict]:
+        """
+        Templates as {template: {'id', 'count', 'examples'}}.
+        
+        Read-only snapshot rebuilt on every access, so changes to it don't
+        reach the parser. Use get_template() for single lookups.
+        """
+        return {
+            template: {
+                'id': template_id,
+                'count': self._count[template_id],
+                'examples': list(self._examples[template_id])
+            }
+            for template, template_id in self._id_of.items()
+        }
+    
+    def get_template(self, template: str) -> Optional[dict]:
+        """
+        Look up a single template without building the full templates dict.
+        
+        Args:
+            template: Template string
+            
+        Returns:
+            {'id', 'count', 'examples'} for the template, or None if unknown
+        """
+        template_id = self._id_of.get(template)
+        if template_id is None:
+            return None
+        return {
+            'id': template_id,
+            'count': self._count[template_id],
+            'examples': list(self._examples[template_id])
+        }
         
     def parse_log(self, log_line: str) -> str:
         """
@@ -43,20 +292,31 @@ class DrainParser:
         # Remove timestamp and other variable parts
         # This is a simplified version - you can enhance this based on your log format
         template = self._extract_template(log_line)
+        self._add_template(template, log_line)
+        
+        return template
+    
+    def _add_template(self, template: str, log_line: str):
+        """
+        Record one occurrence of a template.
+        
+        Args:
+            template: Extracted template
+            log_line: Raw log line the template was extracted from
+        """
+        template_id = self._id_of.get(template)
         
         # Add to templates if not seen before
-        if template not in self.templates:
-            self.templates[template] = {
-                'id': self.template_id,
-                'count': 1,
-                'examples': [log_line]
-            }
-            self.template_id += 1
+        if template_id is None:
+            self._id_of[template] = len(self._count)
+            self._count.append(1)
+            self._examples.append([log_line])
+            self._trie.insert(template)
         else:
-            self.templates[template]['count'] += 1
-            self.templates[template]['examples'].append(log_line)
-            
-        return template
+            self._count[template_id] += 1
+            examples = self._examples[template_id]
+            if len(examples) < self.max_examples:
+                examples.append(log_line)
     
     def _extract_template(self, log_line: str) -> str:
         """
@@ -66,32 +326,101 @@ class DrainParser:
             log_line: Raw log line
             
         Returns:
-            Template with variable parts replaced by <*> placeholders
+            Template with variable parts replaced by <timestamp>, <ip>,
+            <uuid>, <path> and <number> placeholders
+        """
+        return _extract_template_cached(log_line)
+    
+    def _extract_template_fast(self, log_line: str) -> str:
+        """
+        Extract template with the compiled byte scanner from _strip.pyx.
+        
+        Gives the same result as _extract_template. Non-ASCII lines, and all
+        lines when the extension isn't built, go through _extract_template.
+        
+        Args:
+            log_line: Raw log line
+            
+        Returns:
+            Template with variable parts replaced by placeholders
+        """
+        if HAVE_STRIP and log_line.isascii():
+            return _strip.strip_variables(log_line.encode('ascii')).decode('ascii').strip()
+        return self._extract_template(log_line)
+    
+    @staticmethod
+    def template_cache_info():
+        """
+        Report hit statistics of the shared template extraction cache.
+        
+        Returns:
+            functools CacheInfo with hits, misses, maxsize and currsize
+        """
+        return _extract_template_cached.cache_info()
+    
+    def _extract_templates_hyperscan(self, log_lines: List[str]) -> List[str]:
+        """
+        Extract templates for a batch of log lines with a single Hyperscan scan.
+        
+        Hyperscan reports every match end with its leftmost start, so the
+        non-overlapping matches that re.sub would pick are rebuilt here: at
+        each start the highest-priority pattern with the longest end wins.
+        If a skipped match runs past the end of a chosen one it could hide a
+        later match, so that line falls back to _extract_template, as do
+        lines the byte-level patterns can't handle identically.
+        
+        Args:
+            log_lines: List of raw log lines
+            
+        Returns:
+            Templates in the same order as log_lines
         """
-        # Remove timestamp patterns (common formats)
-        timestamp_patterns = [
-            r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}',  # 2024-01-01 10:00:00
-            r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}',  # 01/01/2024 10:00:00
-            r'\d{10,}',  # Unix timestamp
-        ]
+        encoded_lines = [log_line.encode('utf-8') for log_line in log_lines]
+        buffer = b'\n'.join(encoded_lines)
         
-        template = log_line
-        for pattern in timestamp_patterns:
-            template = re.sub(pattern, '<timestamp>', template)
+        matches = []
         
-        # Replace IP addresses
-        template = re.sub(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', '<ip>', template)
+        def on_match(pattern_id, start, end, flags, context):
+            if buffer[end - 1] in b' \t\n\r\x0b\x0c':
+                end -= 1
+            matches.append((start, pattern_id, -end))
         
-        # Replace numbers (but keep small ones that might be important)
-        template = re.sub(r'\b\d{5,}\b', '<number>', template)
+        _get_hyperscan_db().scan(buffer, match_event_handler=on_match)
+        matches.sort()
         
-        # Replace file paths
-        template = re.sub(r'/[^\s]+', '<path>', template)
+        placeholders = [f'<{name}>'.encode('ascii') for name, _ in _VARIABLE_PATTERNS]
+        templates = []
+        line_start = 0
+        k = 0
         
-        # Replace UUIDs
-        template = re.sub(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', '<uuid>', template)
+        for log_line, encoded in zip(log_lines, encoded_lines):
+            line_end = line_start + len(encoded)
+            exact = log_line.isascii() and not _HYPERSCAN_UNSAFE_CHARS.search(log_line)
+            pieces = []
+            pos = line_start
+            
+            # Splice placeholders over the matches that fall in this line
+            while k < len(matches) and matches[k][0] < line_end:
+                start, pattern_id, end = matches[k]
+                end = -end
+                k += 1
+                if start < pos:
+                    if end > pos:
+                        exact = False
+                    continue
+                pieces.append(buffer[pos:start])
+                pieces.append(placeholders[pattern_id])
+                pos = end
+            
+            if exact:
+                pieces.append(buffer[pos:line_end])
+                templates.append(b''.join(pieces).decode('ascii').strip())
+            else:
+                templates.append(self._extract_template(log_line))
+            
+            line_start = line_end + 1
         
-        return template.strip()
+        return templates
     
     def extract_templates(self, log_lines: List[str]) -> Dict[str, int]:
         """
@@ -103,34 +432,139 @@ class DrainParser:
         Returns:
             Dictionary mapping templates to their frequencies
         """
-        for log_line in log_lines:
-            self.parse_log(log_line)
+        if HAVE_STRIP:
+            templates = [self._extract_template_fast(log_line) for log_line in log_lines]
+        elif HAVE_HYPERSCAN:
+            templates = self._extract_templates_hyperscan(log_lines)
+        else:
+            templates = list(map(_extract_template_cached, log_lines))
+        
+        if HAVE_DRAIN_FAST:
+            new_templates = _drain_fast.record_templates(templates, log_lines, self._id_of, self._count,
+                                                         self._examples, self.max_examples)
+            for template in new_templates:
+                self._trie.insert(template)
+        else:
+            for log_line, template in zip(log_lines, templates):
+                self._add_template(template, log_line)
             
-        return {template: data['count'] for template, data in self.templates.items()}
+        return dict(zip(self._id_of, self._count))
     
     def save_templates(self, output_file: str):
         """
-        Save extracted templates to JSON file.
+        Save extracted templates to a Parquet or JSON file.
         
         Args:
-            output_file: Path to save templates JSON
+            output_file: Path to save templates, .parquet or .json
         """
-        with open(output_file, 'w') as f:
-            json.dump(self.templates, f, indent=2)
+        save_template_table(output_file, list(self._id_of), range(len(self._count)),
+                            self._count, self._examples)
     
     def load_templates(self, input_file: str):
         """
-        Load templates from JSON file.
+        Load templates from a Parquet or JSON file.
         
         Args:
-            input_file: Path to templates JSON file
+            input_file: Path to templates file, .parquet or .json
         """
-        with open(input_file, 'r') as f:
-            self.templates = json.load(f)
+        self._id_of = {}
+        self._count = array('q')
+        self._examples = []
+        self._trie = TemplateTrie()
+        for template, data in iter_template_file(input_file):
+            self._id_of[template] = len(self._count)
+            self._count.append(data['count'])
+            self._examples.append(data['examples'])
+            self._trie.insert(template)
+    
+    def match_fast(self, log_line: str) -> Optional[str]:
+        """
+        Match a log line against the known templates without re-extracting it.
+        
+        Args:
+            log_line: Raw log line
+            
+        Returns:
+            Matching template, or None if the line fits no known template
+        """
+        return self._trie.match(log_line)
+
+# Lines handed to extract_templates at a time when streaming a log file
+LOG_BATCH_SIZE = 100000
+
+def _iter_log_lines(log_file: str) -> Iterator[str]:
+    """
+    Stream the stripped, non-empty lines of a log file through mmap.
+    
+    Args:
+        log_file: Path to the raw log file
+        
+    Yields:
+        Decoded log lines, invalid UTF-8 ignored
+    """
+    with open(log_file, 'rb') as f:
+        # mmap refuses empty files
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            start = 0
+            # Next \n and \r at or after start, or size if there is none
+            next_lf = next_cr = -1
+            while start < size:
+                # Like text mode, \n, \r and \r\n all end a line; the empty
+                # line between \r and \n is dropped below
+                if next_lf < start:
+                    next_lf = mm.find(b'\n', start)
+                    if next_lf < 0:
+                        next_lf = size
+                if next_cr < start:
+                    next_cr = mm.find(b'\r', start)
+                    if next_cr < 0:
+                        next_cr = size
+                end = min(next_lf, next_cr)
+                line = mm[start:end].decode('utf-8', 'ignore').strip()
+                if line:
+                    yield line
+                start = end + 1
+
+def _process_one(log_file: str) -> Tuple[str, int]:
+    """
+    Extract templates from one raw log file and save them to data/parsed/.
+    
+    Module-level so it can be sent to ProcessPoolExecutor workers.
+    
+    Args:
+        log_file: Path to the raw log file
+        
+    Returns:
+        Tuple of (output_file, number of templates)
+    """
+    log_file = Path(log_file)
+    print(f"Processing {log_file}...")
+    
+    # Extract templates, streaming log lines in bounded batches
+    parser = DrainParser()
+    templates = {}
+    log_lines = _iter_log_lines(str(log_file))
+    while True:
+        batch = list(islice(log_lines, LOG_BATCH_SIZE))
+        if not batch:
+            break
+        templates = parser.extract_templates(batch)
+    
+    # Save templates to Parquet
+    output_file = Path("data/parsed") / f"{log_file.stem}_templates.parquet"
+    parser.save_templates(str(output_file))
+    
+    return str(output_file), len(templates)
 
 def process_raw_logs():
     """
     Process all raw log files in data/raw/ and save templates to data/parsed/.
+    
+    Files are independent, so they are parsed in parallel worker processes.
     """
     raw_dir = Path("data/raw")
     parsed_dir = Path("data/parsed")
@@ -138,24 +572,16 @@ def process_raw_logs():
     # Create parsed directory if it doesn't exist
     parsed_dir.mkdir(parents=True, exist_ok=True)
     
+    log_files = [str(log_file) for log_file in raw_dir.glob("*.log")]
+    if not log_files:
+        return
+    
     # Process each log file in raw directory
-    for log_file in raw_dir.glob("*.log"):
-        print(f"Processing {log_file}...")
-        
-        # Read log lines
-        with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-            log_lines = [line.strip() for line in f if line.strip()]
-        
-        # Extract templates
-        parser = DrainParser()
-        templates = parser.extract_templates(log_lines)
-        
-        # Save templates to JSON
-        output_file = parsed_dir / f"{log_file.stem}_templates.json"
-        parser.save_templates(str(output_file))
-        
-        print(f"Extracted {len(templates)} templates from {log_file}")
-        print(f"Saved templates to {output_file}")
+    max_workers = min(len(log_files), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for log_file, (output_file, num_templates) in zip(log_files, executor.map(_process_one, log_files)):
+            print(f"Extracted {num_templates} templates from {log_file}")
+            print(f"Saved templates to {output_file}")
 
 def main():
     """Main function for processing raw logs."""
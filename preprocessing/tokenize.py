@@ -5,11 +5,12 @@ This module converts parsed templates to token IDs and creates
 fixed-length sequences for training.
 """
 
-import json
 import numpy as np
 from pathlib import Path
 from typing import List, Tuple
 from utils.tokenize_utils import pad_sequences
+from utils.json_io import dumps, loads
+from utils.template_io import find_template_files, iter_template_file
 
 class LogTokenizer:
     """
@@ -29,12 +30,16 @@ class LogTokenizer:
         
     def load_vocab(self, vocab_file: str):
         """Load vocabulary from JSON file."""
-        with open(vocab_file, 'r') as f:
-            vocab_data = json.load(f)
+        with open(vocab_file, 'rb') as f:
+            vocab_data = loads(f.read())
             
-        self.vocab = vocab_data['vocab']
         self.token_to_id = vocab_data['token_to_id']
-        self.id_to_token = vocab_data['id_to_token']
+        self.id_to_token = sorted(self.token_to_id, key=self.token_to_id.__getitem__)
+        self._unk_id = self.token_to_id.get('<UNK>', 1)
+        self._pad_id = self.token_to_id['<PAD>']
+        
+        # Narrowest dtype that holds every token ID
+        self._id_dtype = np.uint16 if len(self.token_to_id) <= 65535 else np.int32
         
     def tokenize(self, template: str) -> int:
         """
@@ -46,9 +51,9 @@ class LogTokenizer:
         Returns:
             Token ID
         """
-        return self.token_to_id.get(template, self.token_to_id['<UNK>'])
+        return self.token_to_id.get(template, self._unk_id)
     
-    def create_sequences(self, template_ids: List[int], window_size: int = 50) -> List[List[int]]:
+    def create_sequences(self, template_ids: List[int], window_size: int = 50) -> np.ndarray:
         """
         Create sliding window sequences from template IDs.
         
@@ -57,15 +62,15 @@ class LogTokenizer:
             window_size: Size of the sliding window
             
         Returns:
-            List of fixed-length sequences
+            Array of shape (num_sequences, window_size). This is a read-only
+            strided view over the template IDs, so copy it before modifying.
         """
-        sequences = []
+        template_ids = np.asarray(template_ids, dtype=self._id_dtype)
         
-        for i in range(0, len(template_ids) - window_size + 1):
-            sequence = template_ids[i:i + window_size]
-            sequences.append(sequence)
+        if len(template_ids) < window_size:
+            return np.empty((0, window_size), dtype=self._id_dtype)
             
-        return sequences
+        return np.lib.stride_tricks.sliding_window_view(template_ids, window_size)
     
     def process_templates_to_sequences(self, window_size: int = 50):
         """
@@ -86,22 +91,18 @@ class LogTokenizer:
             return
         
         # Process each template file
-        for template_file in parsed_dir.glob("*_templates.json"):
+        for template_file in find_template_files(parsed_dir):
             print(f"Processing {template_file}...")
             
-            # Load templates
-            with open(template_file, 'r') as f:
-                templates_data = json.load(f)
-            
             # Extract template order (assuming templates are in order of appearance)
-            template_sequence = []
-            for template_text, template_info in templates_data.items():
-                count = template_info.get('count', 1)
-                # Add template ID repeated by its count
-                template_sequence.extend([template_text] * count)
+            unique_ids = []
+            counts = []
+            for template_text, template_info in iter_template_file(str(template_file)):
+                unique_ids.append(self.tokenize(template_text))
+                counts.append(template_info.get('count', 1))
             
-            # Convert templates to token IDs
-            template_ids = [self.tokenize(template) for template in template_sequence]
+            # Repeat each template's token ID by its count
+            template_ids = np.repeat(np.asarray(unique_ids, dtype=self._id_dtype), counts)
             
             # Create sequences
             sequences = self.create_sequences(template_ids, window_size)
@@ -109,14 +110,14 @@ class LogTokenizer:
             # Save sequences
             output_file = sequences_dir / f"{template_file.stem}_sequences.json"
             sequences_data = {
-                'sequences': sequences,
+                'sequences': np.ascontiguousarray(sequences),
                 'window_size': window_size,
                 'num_sequences': len(sequences),
-                'vocab_size': len(self.vocab)
+                'vocab_size': len(self.token_to_id)
             }
             
-            with open(output_file, 'w') as f:
-                json.dump(sequences_data, f, indent=2)
+            with open(output_file, 'wb') as f:
+                f.write(dumps(sequences_data))
             
             print(f"Created {len(sequences)} sequences from {template_file}")
             print(f"Saved sequences to {output_file}")
@@ -131,22 +132,32 @@ class LogTokenizer:
         Returns:
             Tuple of (input_sequences, target_sequences) for next token prediction
         """
-        input_sequences = []
-        target_sequences = []
+        width = self.max_length - 1
         
-        for sequence in sequences:
+        if isinstance(sequences, np.ndarray):
+            equal_length = sequences.ndim == 2
+        else:
+            equal_length = len({len(sequence) for sequence in sequences}) == 1
+        
+        if not equal_length:
             # For next token prediction, input is sequence[:-1], target is sequence[1:]
-            input_seq = sequence[:-1]
-            target_seq = sequence[1:]
-            
-            # Pad sequences to max_length
-            input_seq = input_seq[:self.max_length-1] + [self.token_to_id['<PAD>']] * max(0, self.max_length-1 - len(input_seq))
-            target_seq = target_seq[:self.max_length-1] + [self.token_to_id['<PAD>']] * max(0, self.max_length-1 - len(target_seq))
-            
-            input_sequences.append(input_seq)
-            target_sequences.append(target_seq)
+            input_sequences = pad_sequences([sequence[:-1] for sequence in sequences], width,
+                                            self._pad_id, dtype=self._id_dtype)
+            target_sequences = pad_sequences([sequence[1:] for sequence in sequences], width,
+                                             self._pad_id, dtype=self._id_dtype)
+            return input_sequences, target_sequences
+        
+        # Equal-length windows, as produced by create_sequences, shift and pad as whole arrays
+        sequences = np.asarray(sequences, dtype=self._id_dtype)
+        input_sequences = sequences[:, :-1][:, :width]
+        target_sequences = sequences[:, 1:][:, :width]
+        
+        pad_width = width - input_sequences.shape[1]
+        if pad_width > 0:
+            input_sequences = np.pad(input_sequences, ((0, 0), (0, pad_width)), constant_values=self._pad_id)
+            target_sequences = np.pad(target_sequences, ((0, 0), (0, pad_width)), constant_values=self._pad_id)
         
-        return np.array(input_sequences), np.array(target_sequences)
+        return np.ascontiguousarray(input_sequences), np.ascontiguousarray(target_sequences)
 
 def main():
     """Main function for tokenization and sequence creation."""
@@ -0,0 +1,118 @@
+"""Tests for DrainParser template matching."""
+
+import random
+import pytest
+from preprocessing import drain_parser
+from preprocessing.drain_parser import DrainParser, TemplateTrie, _iter_log_lines
+
+# Pieces that exercise every variable pattern, glued with and without spaces
+# so matches can touch, overlap and cross word boundaries
+_PIECES = [
+    '2024-01-01 10:00:00', '01/02/2024 23:59:59', '1704103200', '12345678901234',
+    '10.0.0.1', '999.1.2.3', '1.2.3.4.5', '550e8400-e29b-41d4-a716-446655440000',
+    'abcdef12-3456', '/var/log/app.log', '/', 'a/b', '12345', '1234', '0',
+    'INFO', 'ERROR', 'user', 'id=', 'x', '_', '-', ':', '.', 'é', '\x1c', '\t'
+]
+
+# Lines where a skipped match overlaps the one chosen before it
+_OVERLAP_LINES = [
+    '2024-01-01 10:00:00123456789012',
+    '2024-01-01 10:00:00.123 /tmp/x 10.0.0.1',
+    '12345678901.2.3.4',
+    '/path/2024-01-01 10:00:00 done',
+    '550e8400-e29b-41d4-a716-4466554400001234567',
+    'id=99999/abc 1.2.3.4'
+]
+
+def _random_lines(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        ''.join(rng.choice(_PIECES) + rng.choice(['', ' ', '  ']) for _ in range(rng.randint(1, 10)))
+        for _ in range(count)
+    ]
+
+def test_match_fast_returns_template_of_parsed_line():
+    parser = DrainParser()
+    log_line = "2024-01-01 10:00:00 INFO connection from 10.0.0.1 closed"
+    template = parser.parse_log(log_line)
+    assert parser.match_fast(log_line) == template
+    assert parser.match_fast("2024-01-02 11:30:00 INFO connection from 192.168.1.20 closed") == template
+
+def test_match_fast_placeholder_inside_token():
+    parser = DrainParser()
+    template = parser.parse_log("user=12345 ok")
+    assert template == "user=<number> ok"
+    assert parser.match_fast("user=12345 ok") == template
+    assert parser.match_fast("user=67890 ok") == template
+    assert parser.match_fast("user=12 ok") is None
+    assert parser.match_fast("uid=12345 ok") is None
+
+def test_match_fast_timestamp_inside_token_spans_two_tokens():
+    parser = DrainParser()
+    template = parser.parse_log("at=2024-01-01 10:00:00 started")
+    assert parser.match_fast("at=2024-05-06 07:08:09 started") == template
+
+def test_match_fast_long_line():
+    parser = DrainParser()
+    log_line = " ".join(f"token{i}" for i in range(3000))
+    template = parser.parse_log(log_line)
+    assert parser.match_fast(log_line) == template
+
+def test_wildcards_absorb_multiple_tokens():
+    trie = TemplateTrie()
+    trie.insert("start <*> end")
+    assert trie.match("start a b c end") == "start <*> end"
+    assert trie.match("start end") is None
+
+def test_failed_wildcard_match_on_long_line():
+    # Exponential backtracking or one recursion level per token would not
+    # get through 5000 tokens
+    trie = TemplateTrie()
+    trie.insert(" ".join(["<*>"] * 12 + ["END"]))
+    assert trie.match(" ".join(["x"] * 5000)) is None
+    assert trie.match(" ".join(["x"] * 5000 + ["END"])) is not None
+
+def test_bare_placeholder_checks_its_pattern():
+    parser = DrainParser()
+    template = parser.parse_log("user 12345 ok")
+    assert template == "user <number> ok"
+    assert parser.match_fast("user 67890 ok") == template
+    assert parser.match_fast("user bob ok") is None
+    assert parser.match_fast("user bob smith ok") is None
+    # Ten digits extract as <timestamp>, not <number>
+    assert parser.match_fast("user 1704103200 ok") is None
+
+@pytest.mark.skipif(not drain_parser.HAVE_HYPERSCAN, reason="hyperscan not installed")
+def test_hyperscan_extraction_matches_regex():
+    parser = DrainParser()
+    log_lines = _OVERLAP_LINES + _random_lines(20000)
+    expected = [parser._extract_template(log_line) for log_line in log_lines]
+    assert parser._extract_templates_hyperscan(log_lines) == expected
+
+# Edge cases for the byte scanner: word boundaries, digit runs inside words,
+# UUID prefixes and the \x1c-\x1f separators Python's \s matches
+_STRIP_EDGE_LINES = [
+    '999.1.2.3', '1.2.3.4a', 'a1.2.3.4', '1.2.3', '1234.5.6.7',
+    'abc12345678901def', 'x1234567890', '123456789', '12345x', 'x12345', '_12345',
+    '550e8400-e29b-41d4-a716-44665544000', '550e8400-e29b', '550E8400-E29B-41D4-A716-446655440000',
+    'abcdef12-3456-7890-abcd-ef1234567890', '2024-01-01 10:00:0', '2024-01-01  10:00:00',
+    '/', '/ x', '//', 'a/\x1cb', '\x1c/path\x1c12345', '12345\x1c', '\x1f999.1.2.3\x1e',
+    'ends with /'
+]
+
+@pytest.mark.skipif(not drain_parser.HAVE_STRIP, reason="_strip extension not built")
+def test_strip_scanner_matches_regex():
+    parser = DrainParser()
+    log_lines = _STRIP_EDGE_LINES + _OVERLAP_LINES + _random_lines(200000, seed=1)
+    for log_line in log_lines:
+        assert parser._extract_template_fast(log_line) == parser._extract_template(log_line), repr(log_line)
+
+def test_iter_log_lines_splits_on_all_line_endings(tmp_path):
+    log_file = tmp_path / "mixed.log"
+    log_file.write_bytes(b"a\r\nb\rc\n\n  d")
+    assert list(_iter_log_lines(str(log_file))) == ["a", "b", "c", "d"]
+
+def test_iter_log_lines_empty_file(tmp_path):
+    log_file = tmp_path / "empty.log"
+    log_file.write_bytes(b"")
+    assert list(_iter_log_lines(str(log_file))) == []
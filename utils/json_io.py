@@ -0,0 +1,72 @@
+"""
+JSON I/O Utilities for LogBERT
+
+Fast JSON serialization helpers backed by orjson, with a stdlib fallback.
+Both dumps() and loads() work on bytes, so files must be opened in binary mode.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+    HAVE_ORJSON = True
+except ImportError:
+    HAVE_ORJSON = False
+
+def _default(obj: Any) -> Any:
+    """Convert numpy arrays and scalars for the stdlib encoder."""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if HAVE_ORJSON:
+    _ORJSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj: Any) -> bytes:
+        """
+        Serialize an object to indented JSON bytes.
+
+        Args:
+            obj: Object to serialize (numpy arrays are supported)
+
+        Returns:
+            UTF-8 encoded JSON
+        """
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """
+        Deserialize JSON bytes or text.
+
+        Args:
+            data: JSON document
+
+        Returns:
+            Deserialized object
+        """
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> bytes:
+        """
+        Serialize an object to indented JSON bytes.
+
+        Args:
+            obj: Object to serialize (numpy arrays are supported)
+
+        Returns:
+            UTF-8 encoded JSON
+        """
+        return json.dumps(obj, indent=2, default=_default).encode('utf-8')
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """
+        Deserialize JSON bytes or text.
+
+        Args:
+            data: JSON document
+
+        Returns:
+            Deserialized object
+        """
+        return json.loads(data)
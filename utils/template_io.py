@@ -0,0 +1,93 @@
+"""
+Template File I/O for LogBERT
+
+Read and write parsed template tables. Parquet (zstd-compressed, one row per
+template) is the pipeline format in data/parsed/. JSON files in the
+{template: {'id', 'count', 'examples'}} layout are still supported for the
+dashboard and for older parser output; the format is chosen by file suffix.
+"""
+
+import ijson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+from utils.json_io import dumps
+
+TEMPLATE_SCHEMA = pa.schema([
+    ('template', pa.string()),
+    ('id', pa.int32()),
+    ('count', pa.int64()),
+    ('examples', pa.list_(pa.string()))
+])
+
+def find_template_files(parsed_dir: Path) -> List[Path]:
+    """
+    List the *_templates.parquet and *_templates.json files in a directory.
+
+    When both formats exist for the same log file, only the Parquet file is
+    returned so its templates aren't counted twice.
+
+    Args:
+        parsed_dir: Directory holding parser output
+        
+    Returns:
+        Template files sorted by name
+    """
+    parquet_files = list(parsed_dir.glob("*_templates.parquet"))
+    parquet_stems = {template_file.stem for template_file in parquet_files}
+    json_files = [template_file for template_file in parsed_dir.glob("*_templates.json")
+                  if template_file.stem not in parquet_stems]
+    return sorted(parquet_files + json_files)
+
+def save_template_table(output_file: str, templates: Sequence[str], ids: Sequence[int],
+                        counts: Sequence[int], examples: Sequence[List[str]]):
+    """
+    Save templates given as parallel columns.
+
+    Args:
+        output_file: Path ending in .parquet or .json
+        templates: Template strings
+        ids: Template IDs
+        counts: Occurrence count per template
+        examples: Example log lines per template
+    """
+    if Path(output_file).suffix == '.parquet':
+        table = pa.table({
+            'template': pa.array(templates, type=pa.string()),
+            'id': pa.array(ids, type=pa.int32()),
+            'count': pa.array(counts, type=pa.int64()),
+            'examples': pa.array(examples, type=pa.list_(pa.string()))
+        }, schema=TEMPLATE_SCHEMA)
+        pq.write_table(table, output_file, compression='zstd')
+    else:
+        data = {
+            template: {'id': template_id, 'count': count, 'examples': template_examples}
+            for template, template_id, count, template_examples in zip(templates, ids, counts, examples)
+        }
+        with open(output_file, 'wb') as f:
+            f.write(dumps(data))
+
+def iter_template_file(input_file: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Stream templates from a Parquet or JSON template file.
+
+    Args:
+        input_file: Path ending in .parquet or .json
+
+    Yields:
+        (template, {'id', 'count', 'examples'}) pairs in file order
+    """
+    if Path(input_file).suffix == '.parquet':
+        for batch in pq.ParquetFile(input_file).iter_batches():
+            columns = zip(
+                batch.column('template').to_pylist(),
+                batch.column('id').to_pylist(),
+                batch.column('count').to_pylist(),
+                batch.column('examples').to_pylist()
+            )
+            for template, template_id, count, examples in columns:
+                yield template, {'id': template_id, 'count': count, 'examples': examples}
+    else:
+        with open(input_file, 'rb') as f:
+            yield from ijson.kvitems(f, '')
@@ -5,11 +5,30 @@ Helper functions for tokenization, padding, and sequence processing.
 """
 
 import numpy as np
+from itertools import repeat
 from typing import List, Tuple, Union
 import torch
 
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+if HAVE_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _mask_lm_numba(sequences, labels, mask_prob, mask_id):
+        """Numba kernel for create_masked_lm_labels, parallel over rows. Fills labels in place."""
+        masked_sequences = sequences.copy()
+        for i in prange(sequences.shape[0]):
+            for j in range(sequences.shape[1]):
+                if np.random.random() < mask_prob:
+                    labels[i, j] = sequences[i, j]
+                    masked_sequences[i, j] = mask_id
+        return masked_sequences
+
 def pad_sequences(sequences: List[List[int]], max_length: int, 
-                  padding_value: int = 0) -> np.ndarray:
+                  padding_value: int = 0, dtype: np.dtype = np.int32) -> np.ndarray:
     """
     Pad sequences to the same length.
     
@@ -17,18 +36,16 @@ def pad_sequences(sequences: List[List[int]], max_length: int,
         sequences: List of token sequences
         max_length: Maximum sequence length
         padding_value: Value to use for padding
+        dtype: Integer dtype of the result, e.g. np.uint16 for vocabularies up to 65535 tokens
         
     Returns:
         Padded sequences as numpy array
     """
-    padded = []
-    for seq in sequences:
-        if len(seq) > max_length:
-            seq = seq[:max_length]
-        else:
-            seq = seq + [padding_value] * (max_length - len(seq))
-        padded.append(seq)
-    return np.array(padded)
+    padded = np.full((len(sequences), max_length), padding_value, dtype=dtype)
+    for i, seq in enumerate(sequences):
+        seq = seq[:max_length]
+        padded[i, :len(seq)] = seq
+    return padded
 
 def create_attention_mask(sequences: np.ndarray, padding_value: int = 0) -> np.ndarray:
     """
@@ -41,7 +58,7 @@ def create_attention_mask(sequences: np.ndarray, padding_value: int = 0) -> np.n
     Returns:
         Attention mask (1 for real tokens, 0 for padding)
     """
-    mask = (sequences != padding_value).astype(np.int64)
+    mask = (sequences != padding_value).astype(np.uint8)
     return mask
 
 def create_masked_lm_labels(sequences: np.ndarray, mask_prob: float = 0.15,
@@ -55,17 +72,22 @@ def create_masked_lm_labels(sequences: np.ndarray, mask_prob: float = 0.15,
         vocab_size: Size of vocabulary
         
     Returns:
-        Tuple of (masked_sequences, labels)
+        Tuple of (masked_sequences, labels). Labels use a signed dtype wide
+        enough for the token IDs so -100 fits even for uint16 sequences.
     """
-    masked_sequences = sequences.copy()
-    labels = np.full_like(sequences, -100)  # -100 is ignored in loss computation
+    # -100 is ignored in loss computation
+    labels = np.full(sequences.shape, -100, dtype=np.promote_types(sequences.dtype, np.int8))
     
-    for i in range(len(sequences)):
-        for j in range(len(sequences[i])):
-            if np.random.random() < mask_prob:
-                labels[i, j] = sequences[i, j]
-                masked_sequences[i, j] = 2  # MASK token ID
-                
+    if HAVE_NUMBA and sequences.ndim == 2:
+        masked_sequences = _mask_lm_numba(sequences, labels, mask_prob, 2)  # 2 is the MASK token ID
+        return masked_sequences, labels
+    
+    rng = np.random.default_rng()
+    mask = rng.random(sequences.shape, dtype=np.float32) < mask_prob
+
+    labels[mask] = sequences[mask]
+    masked_sequences = np.where(mask, 2, sequences).astype(sequences.dtype)  # 2 is the MASK token ID
+
     return masked_sequences, labels
 
 def truncate_sequences(sequences: List[List[int]], max_length: int) -> List[List[int]]:
@@ -114,5 +136,24 @@ def batch_encode(sequences: List[str], vocab: dict, max_length: int = 512) -> np
     Returns:
         Encoded sequences as numpy array
     """
-    encoded = [tokenize_text(seq, vocab, max_length) for seq in sequences]
-    return pad_sequences(encoded, max_length) 
\ No newline at end of file
+    # Flatten all tokens so the vocabulary lookup is one C-level map
+    all_tokens = []
+    lengths = []
+    for seq in sequences:
+        tokens = seq.split()[:max_length]
+        lengths.append(len(tokens))
+        all_tokens.extend(tokens)
+    
+    unk_id = vocab.get('<UNK>', 1)
+    token_ids = np.fromiter(map(vocab.get, all_tokens, repeat(unk_id)),
+                            dtype=np.int32, count=len(all_tokens))
+    
+    # Scatter the flat IDs into a padded (batch, max_length) array
+    lengths = np.asarray(lengths, dtype=np.intp)
+    row_starts = np.cumsum(lengths) - lengths
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    cols = np.arange(len(token_ids)) - np.repeat(row_starts, lengths)
+    
+    encoded = np.zeros((len(lengths), max_length), dtype=np.int32)
+    encoded[rows, cols] = token_ids
+    return encoded 
\ No newline at end of file